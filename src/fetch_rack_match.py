@@ -4,23 +4,60 @@ from __future__ import annotations
 
 import argparse
 import csv
+import email.message
+import functools
 import json
+import mmap
 import re
+import socket
 import subprocess
 import sys
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional, Tuple
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
 
 try:
     import requests
 except ImportError:  # pragma: no cover - fallback for environments without requests
     requests = None
+try:
+    import orjson
+except ImportError:  # pragma: no cover - fallback to the stdlib decoder
+    orjson = None
+import http.client
+import urllib.parse
 import urllib.request
 import urllib.error
 
 
 DEFAULT_API_URL = "http://10.10.10.1:5223/api/v1/projects/SBS%2096"
 
+# orjson decodes bytes directly and is markedly faster on large reader payloads.
+_json_loads = orjson.loads if orjson is not None else json.loads
+
+# Captures at least this large are parsed from a memory map instead of a copy.
+_MMAP_THRESHOLD = 1 << 20
+
+_POS_RE = re.compile(r"([A-Z]+)0*(\d+)")
+_ROW_LETTERS = frozenset("ABCDEFGH")
+
+# Scanner read for one well: (result, hasTube, passed).
+WellRead = Tuple[str, bool, bool]
+
+# Output status indexed by (not hasTube) << 1 | (not passed).
+_STATUS = ("ok", "decode_failed", "empty", "empty,decode_failed")
+
+_OUTPUT_HEADER = ("Position", "SampleID", "ScannerResult", "Status")
+# Status values as csv.writer would emit them, for the fast output path.
+_STATUS_FIELDS = {
+    status: f'"{status}"' if "," in status else status for status in (*_STATUS, "no_scan")
+}
+_CSV_SPECIAL_RE = re.compile(r'[,"\r\n]')
+
+# HTTP handles reused across fetches so batch callers keep connections alive.
+_SESSION: Optional["requests.Session"] = None
+_OPENERS: Dict[bool, urllib.request.OpenerDirector] = {}
+_HTTP_CONNECTIONS: Dict[Tuple[str, Optional[int]], http.client.HTTPConnection] = {}
+
 
 class RackMismatchError(RuntimeError):
     """Raised when the scanned rack ID does not match the expected one."""
@@ -69,30 +106,56 @@ def parse_args() -> argparse.Namespace:
     )
     parser.add_argument(
         "--backend",
-        choices=("auto", "requests", "urllib", "curl"),
+        choices=("auto", *_BACKENDS),
         default="auto",
         help="HTTP backend to use when talking to the reader (default: auto).",
     )
+    parser.add_argument(
+        "--pandas",
+        action="store_true",
+        help=(
+            "Parse the CSV layout with pandas when it is installed. "
+            "Intended for batch workflows; falls back to the csv module otherwise."
+        ),
+    )
     return parser.parse_args()
 
 
+@functools.lru_cache(maxsize=256)
 def normalize_position(raw: str) -> str:
-    """Normalise well identifiers to A01..H12 style for reliable matching."""
+    """Normalise well identifiers to A01..H12 style for reliable matching.
+
+    Results are interned so layout and scanner positions share one string
+    object, letting dict lookups between them succeed on identity.
+    """
     if raw is None:
         raise ValueError("Position identifier cannot be None")
 
     token = raw.strip().upper()
-    match = re.fullmatch(r"([A-Z]+)0*(\d+)", token)
+    # Fast path for the usual SBS 96 identifiers (A1..H12, A01..H12).
+    if len(token) in (2, 3) and token[0] in _ROW_LETTERS and token[1:].isdecimal():
+        return sys.intern(token[0] + token[1:].zfill(2))
+
+    match = _POS_RE.fullmatch(token)
     if not match:
-        return token
+        return sys.intern(token)
 
     row_letters, column_digits = match.groups()
-    return f"{row_letters}{column_digits.zfill(2)}"
+    return sys.intern(f"{row_letters}{column_digits.zfill(2)}")
 
 
-def read_layout(csv_path: Path) -> List[Tuple[str, str]]:
-    """Load rack layout entries as (normalized_position, sample_id)."""
-    entries: List[Tuple[str, str]] = []
+def read_layout(csv_path: Path, *, use_pandas: bool = False) -> List[Tuple[str, str]]:
+    """Load rack layout entries as (normalized_position, sample_id).
+
+    Repeated rows for the same position and sample are collapsed into one entry.
+    With ``use_pandas`` (and pandas installed) the file is parsed by pandas;
+    single-column rows are then read as having an empty sample ID.
+    """
+    if use_pandas:
+        layout = _read_layout_pandas(csv_path)
+        if layout is not None:
+            return layout
+
     seen: Dict[str, str] = {}
     with csv_path.open("r", encoding="utf-8-sig", newline="") as handle:
         reader = csv.reader(handle)
@@ -108,29 +171,80 @@ def read_layout(csv_path: Path) -> List[Tuple[str, str]]:
             if not position_raw:
                 raise ValueError(f"Row {idx} in {csv_path} is missing a position identifier")
             normalized = normalize_position(position_raw)
-            if normalized in seen and seen[normalized] != sample_id:
+            previous = seen.setdefault(normalized, sample_id)
+            if previous != sample_id:
                 raise ValueError(
                     f"Duplicate position {normalized} with conflicting sample IDs: "
-                    f"{seen[normalized]!r} vs {sample_id!r}"
+                    f"{previous!r} vs {sample_id!r}"
                 )
-            seen[normalized] = sample_id
-            entries.append((normalized, sample_id))
-    if not entries:
+    if not seen:
         raise ValueError(f"No usable data found in {csv_path}")
-    return entries
+    return list(seen.items())
+
+
+def _read_layout_pandas(csv_path: Path) -> Optional[List[Tuple[str, str]]]:
+    # Imported here so runs without --pandas don't pay pandas' import cost.
+    try:
+        import pandas as pd
+    except ImportError:  # pragma: no cover - the csv module is used instead
+        return None
+
+    try:
+        frame = pd.read_csv(
+            csv_path,
+            header=None,
+            usecols=[0, 1],
+            dtype=str,
+            keep_default_na=False,
+            encoding="utf-8-sig",
+        )
+    except pd.errors.EmptyDataError:
+        raise ValueError(f"No usable data found in {csv_path}") from None
+    except ValueError as exc:
+        raise ValueError(f"Could not read two columns from {csv_path}: {exc}") from exc
+
+    positions = frame[0].str.strip()
+    missing = positions == ""
+    if missing.any():
+        idx = _physical_row_number(csv_path, int(missing.to_numpy().argmax()) + 1)
+        raise ValueError(f"Row {idx} in {csv_path} is missing a position identifier")
+
+    layout = pd.DataFrame(
+        {"position": positions.map(normalize_position), "sample_id": frame[1].str.strip()}
+    ).drop_duplicates()
+    conflicts = layout["position"].duplicated()
+    if conflicts.any():
+        position = layout["position"][conflicts].iloc[0]
+        first, second = layout.loc[layout["position"] == position, "sample_id"].iloc[:2]
+        raise ValueError(
+            f"Duplicate position {position} with conflicting sample IDs: "
+            f"{first!r} vs {second!r}"
+        )
+    if layout.empty:
+        raise ValueError(f"No usable data found in {csv_path}")
+    return list(layout.itertuples(index=False, name=None))
+
+
+def _physical_row_number(csv_path: Path, data_row: int) -> int:
+    """Map pandas' 1-based data row to the row number csv.reader would report."""
+    with csv_path.open("r", encoding="utf-8-sig", newline="") as handle:
+        seen = 0
+        for idx, row in enumerate(csv.reader(handle), start=1):
+            # pandas skips blank and whitespace-only lines.
+            if not row or (len(row) == 1 and not row[0].strip()):
+                continue
+            seen += 1
+            if seen == data_row:
+                return idx
+    return data_row
 
 
 def fetch_payload(url: str, timeout: float, *, trust_env: bool, backend: str) -> Any:
     """Fetch JSON payload from the reader using the selected backend."""
     errors: List[Exception] = []
-    for method in _resolve_backends(backend):
+    for fetch in _resolve_backends(backend):
         try:
-            if method == "requests":
-                return _fetch_via_requests(url, timeout=timeout, trust_env=trust_env)
-            if method == "urllib":
-                return _fetch_via_urllib(url, timeout=timeout, trust_env=trust_env)
-            if method == "curl":
-                return _fetch_via_curl(url, timeout=timeout, trust_env=trust_env)
+            return fetch(url, timeout=timeout, trust_env=trust_env)
         except Exception as exc:  # pragma: no cover - backend failures are surfaced collectively
             errors.append(exc)
     if errors:
@@ -138,29 +252,116 @@ def fetch_payload(url: str, timeout: float, *, trust_env: bool, backend: str) ->
     raise RuntimeError("No HTTP backend is configured")
 
 
-def _resolve_backends(backend: str) -> List[str]:
+def _resolve_backends(backend: str) -> List[Callable[..., Any]]:
     if backend == "auto":
-        return ["requests", "urllib", "curl"]
-    return [backend]
+        return list(_BACKENDS.values())
+    return [_BACKENDS[backend]]
+
+
+def close_session() -> None:
+    """Close the pooled HTTP session and connections kept between fetches."""
+    global _SESSION
+    if _SESSION is not None:
+        _SESSION.close()
+        _SESSION = None
+    while _HTTP_CONNECTIONS:
+        _HTTP_CONNECTIONS.popitem()[1].close()
 
 
 def _fetch_via_requests(url: str, *, timeout: float, trust_env: bool) -> Any:
+    global _SESSION
     if requests is None:
         raise RuntimeError("The requests library is not available")
-    with requests.Session() as session:
-        session.trust_env = trust_env
-        response = session.get(url, timeout=timeout)
-        response.raise_for_status()
-        return response.json()
+    if _SESSION is None:
+        _SESSION = requests.Session()
+    _SESSION.trust_env = trust_env
+    response = _SESSION.get(url, timeout=timeout)
+    response.raise_for_status()
+    # Only an explicit charset counts; response.encoding guesses ISO-8859-1 for text/*.
+    charset = _content_type_charset(response.headers.get("Content-Type"))
+    return _decode_body(response.content, charset)
+
+
+def _get_opener(trust_env: bool) -> urllib.request.OpenerDirector:
+    opener = _OPENERS.get(trust_env)
+    if opener is None:
+        opener_args = () if trust_env else (urllib.request.ProxyHandler({}),)
+        opener = _OPENERS[trust_env] = urllib.request.build_opener(*opener_args)
+    return opener
+
+
+def _content_type_charset(content_type: Optional[str]) -> Optional[str]:
+    if not content_type:
+        return None
+    message = email.message.Message()
+    message["Content-Type"] = content_type
+    return message.get_content_charset()
+
+
+def _decode_body(body: bytes, charset: Optional[str]) -> Any:
+    if charset and charset.lower() not in ("utf-8", "utf8"):
+        return _json_loads(body.decode(charset))
+    return _json_loads(body)
+
+
+def _fetch_via_http_client(url: str, *, timeout: float) -> Optional[Tuple[bytes, Optional[str]]]:
+    """GET a plain http:// URL over a kept-alive connection.
+
+    Returns (body, charset), or None when the urllib opener should take over:
+    for URLs this path does not handle (other schemes, no hostname) and for
+    3xx responses, so redirects are still followed.
+    """
+    parts = urllib.parse.urlsplit(url)
+    if parts.scheme != "http" or not parts.hostname:
+        return None
+    key = (parts.hostname, parts.port)
+    path = parts.path or "/"
+    if parts.query:
+        path = f"{path}?{parts.query}"
+
+    conn = _HTTP_CONNECTIONS.pop(key, None)
+    # Only a pooled socket may have gone stale, so only that case is retried.
+    reused = conn is not None and conn.sock is not None
+    if conn is None:
+        conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=timeout)
+    while True:
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+        try:
+            conn.request("GET", path, headers={"Accept": "application/json"})
+            response = conn.getresponse()
+            body = response.read()
+            break
+        except (OSError, http.client.HTTPException) as exc:
+            conn.close()
+            if not reused or isinstance(exc, socket.timeout):
+                raise ConnectionError(f"Failed to fetch data from {url}: {exc}") from exc
+            reused = False
+            conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=timeout)
+    _HTTP_CONNECTIONS[key] = conn
+
+    if 300 <= response.status < 400:
+        return None
+    if not 200 <= response.status < 300:
+        raise ConnectionError(
+            f"Failed to fetch data from {url}: HTTP Error {response.status}: {response.reason}"
+        )
+    return body, response.headers.get_content_charset()
 
 
 def _fetch_via_urllib(url: str, *, timeout: float, trust_env: bool) -> Any:
-    opener_args = () if trust_env else (urllib.request.ProxyHandler({}),)
-    opener = urllib.request.build_opener(*opener_args)
+    # Without environment proxies, plain http:// requests (the LAN reader) skip
+    # the opener chain and reuse a direct connection.
+    if not trust_env:
+        fetched = _fetch_via_http_client(url, timeout=timeout)
+        if fetched is not None:
+            return _decode_body(*fetched)
+
+    opener = _get_opener(trust_env)
     try:
         with opener.open(url, timeout=timeout) as response:  # type: ignore[arg-type]
-            charset = response.headers.get_content_charset() or "utf-8"
-            return json.loads(response.read().decode(charset))
+            return _decode_body(response.read(), response.headers.get_content_charset())
     except urllib.error.URLError as exc:  # type: ignore[attr-defined]
         raise ConnectionError(f"Failed to fetch data from {url}: {exc}") from exc
 
@@ -183,72 +384,120 @@ def _fetch_via_curl(url: str, *, timeout: float, trust_env: bool) -> Any:
             cmd,
             check=True,
             capture_output=True,
-            text=True,
         )
     except FileNotFoundError as exc:
         raise RuntimeError("curl command not found on PATH") from exc
     except subprocess.CalledProcessError as exc:
-        stderr = exc.stderr.strip()
+        stderr = exc.stderr.decode("utf-8", errors="replace").strip()
         message = stderr or f"curl failed with exit code {exc.returncode}"
         raise ConnectionError(message) from exc
     try:
-        return json.loads(completed.stdout)
+        return _json_loads(completed.stdout)
     except json.JSONDecodeError as exc:
         raise ValueError("curl returned invalid JSON") from exc
 
 
+_BACKENDS: Dict[str, Callable[..., Any]] = {
+    "requests": _fetch_via_requests,
+    "urllib": _fetch_via_urllib,
+    "curl": _fetch_via_curl,
+}
+
+
+def load_json_file(path: Path) -> Any:
+    """Parse a JSON payload captured from the reader."""
+    if orjson is not None and path.stat().st_size >= _MMAP_THRESHOLD:
+        # orjson parses straight from the mapped pages, avoiding a bytes copy.
+        with path.open("rb") as handle:
+            with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                with memoryview(mapped) as view:
+                    return orjson.loads(view)
+    return _json_loads(path.read_bytes())
+
+
 def iter_decode_items(node: Any) -> Iterable[Dict[str, Any]]:
     """Yield dict nodes that contain decode information regardless of nesting."""
+    # Only containers are pushed, so scalar leaves never touch the stack. Exact
+    # type checks are enough here since JSON decoders return plain dicts/lists.
+    if type(node) is not dict and type(node) is not list:
+        return
     stack: List[Any] = [node]
+    pop = stack.pop
+    push = stack.append
     while stack:
-        current = stack.pop()
-        if isinstance(current, dict):
-            if "decode" in current and isinstance(current["decode"], dict):
-                stack.extend(current.values())
+        current = pop()
+        if type(current) is dict:
+            if type(current.get("decode")) is dict:
                 yield current
-            else:
-                stack.extend(current.values())
-        elif isinstance(current, list):
-            stack.extend(current)
-
-
-def extract_scanner_results(payload: Any) -> Tuple[str, Dict[str, Dict[str, Any]]]:
-    """Return (rack_id, position -> decode info) from the payload."""
+            children: Iterable[Any] = current.values()
+        else:
+            children = current
+        for child in children:
+            child_type = type(child)
+            if child_type is dict or child_type is list:
+                push(child)
+
+
+def extract_scanner_results(
+    payload: Any,
+    layout_positions: FrozenSet[str],
+) -> Tuple[str, Dict[str, Optional[WellRead]], List[str]]:
+    """Return (rack_id, position -> read, extra_positions) from the payload.
+
+    Reads are only kept for positions in ``layout_positions``; any other scanned
+    positions are reported once each in ``extra_positions``. Layout positions
+    the scanner did not report map to ``None``.
+    """
     rack_id: Optional[str] = None
-    wells: Dict[str, Dict[str, Any]] = {}
+    # Seeding with the layout sizes the dict once instead of growing it per well.
+    wells: Dict[str, Optional[WellRead]] = dict.fromkeys(layout_positions)
+    filled = 0
+    # Keyed by position so repeated extras are recorded once, in walk order.
+    extras: Dict[str, None] = {}
 
     for item in iter_decode_items(payload):
         item_type = item.get("itemType")
-        decode = item.get("decode") or {}
+        decode = item["decode"]
         result = decode.get("result")
         if not result:
             continue
+        # Decoded JSON values are normally already str; skip the str() call then.
+        if type(result) is not str:
+            result = str(result)
 
         if item_type == 2 and rack_id is None:
-            rack_id = str(result).strip()
+            rack_id = result.strip()
         elif item_type == 1:
-            position_raw = str(item.get("id") or "").strip()
+            position_raw = item.get("id") or ""
+            if type(position_raw) is not str:
+                position_raw = str(position_raw)
+            position_raw = position_raw.strip()
             if not position_raw:
                 continue
             normalized = normalize_position(position_raw)
-            wells[normalized] = {
-                "result": str(result).strip(),
-                "hasTube": bool(decode.get("hasTube", False)),
-                "passed": bool(decode.get("passed", False)),
-            }
+            if normalized not in layout_positions:
+                extras[normalized] = None
+                continue
+            if wells[normalized] is None:
+                filled += 1
+            wells[normalized] = (
+                result.strip(),
+                bool(decode.get("hasTube", False)),
+                bool(decode.get("passed", False)),
+            )
 
     if rack_id is None:
         raise ValueError("Could not determine rack ID from the scanner payload")
 
-    if not wells:
+    if not filled and not extras:
         raise ValueError("Scanner payload did not contain any tube decode entries")
 
-    return rack_id, wells
+    return rack_id, wells, list(extras)
 
 
 def build_output_rows(
     layout: List[Tuple[str, str]],
-    scanner_data: Dict[str, Dict[str, Any]],
+    scanner_data: Dict[str, Optional[WellRead]],
 ) -> List[Tuple[str, str, str, str]]:
     """Combine layout entries with scanner reads.
 
@@ -256,36 +505,58 @@ def build_output_rows(
     where Status highlights missing tubes or decode failures.
     """
     rows: List[Tuple[str, str, str, str]] = []
+    append = rows.append
+    lookup = scanner_data.get
     for position, sample_id in layout:
-        scanner_entry = scanner_data.get(position)
-        if not scanner_entry:
-            rows.append((position, sample_id, "", "no_scan"))
+        scanner_entry = lookup(position)
+        if scanner_entry is None:
+            append((position, sample_id, "", "no_scan"))
             continue
 
-        status_flags: List[str] = []
-        if not scanner_entry.get("hasTube", False):
-            status_flags.append("empty")
-        if not scanner_entry.get("passed", False):
-            status_flags.append("decode_failed")
-
-        status = ",".join(status_flags) if status_flags else "ok"
-        rows.append((position, sample_id, scanner_entry.get("result", ""), status))
+        result, has_tube, passed = scanner_entry
+        append((position, sample_id, result, _STATUS[(not has_tube) << 1 | (not passed)]))
     return rows
 
 
-def write_output(rows: List[Tuple[str, str, str, str]], output_path: Path) -> None:
-    with output_path.open("w", encoding="utf-8", newline="") as handle:
+def write_output(
+    rows: Iterable[Tuple[str, str, str, str]],
+    output_path: Path,
+    *,
+    fast_csv: bool = True,
+) -> None:
+    """Write the paired CSV.
+
+    With ``fast_csv`` the file is formatted directly and written in one call, as
+    long as no field needs CSV quoting; otherwise ``csv.writer`` is used.
+    """
+    rows = list(rows)
+    if fast_csv and _write_output_fast(rows, output_path):
+        return
+    # A large buffer lets a whole rack go out in a single write() call.
+    with output_path.open("w", encoding="utf-8", newline="", buffering=1 << 20) as handle:
         writer = csv.writer(handle)
-        writer.writerow(["Position", "SampleID", "ScannerResult", "Status"])
+        writer.writerow(_OUTPUT_HEADER)
         writer.writerows(rows)
 
 
+def _write_output_fast(rows: List[Tuple[str, str, str, str]], output_path: Path) -> bool:
+    lines = [",".join(_OUTPUT_HEADER) + "\r\n"]
+    append = lines.append
+    for position, sample_id, result, status in rows:
+        status_field = _STATUS_FIELDS.get(status)
+        if status_field is None or _CSV_SPECIAL_RE.search(f"{position}{sample_id}{result}"):
+            return False
+        append(f"{position},{sample_id},{result},{status_field}\r\n")
+    output_path.write_bytes("".join(lines).encode("utf-8"))
+    return True
+
+
 def main() -> int:
     args = parse_args()
-    layout = read_layout(args.csv_path)
+    layout = read_layout(args.csv_path, use_pandas=args.pandas)
 
     if args.json_file:
-        payload = json.loads(args.json_file.read_text(encoding="utf-8"))
+        payload = load_json_file(args.json_file)
     else:
         payload = fetch_payload(
             args.url,
@@ -294,7 +565,9 @@ def main() -> int:
             backend=args.backend,
         )
 
-    rack_id, scanner_wells = extract_scanner_results(payload)
+    rack_id, scanner_wells, extra_positions = extract_scanner_results(
+        payload, frozenset(position for position, _ in layout)
+    )
 
     expected_rack = Path(args.csv_path).stem
     if rack_id != expected_rack:
@@ -310,8 +583,8 @@ def main() -> int:
 
     write_output(rows, output_path)
 
-    extra_positions = sorted(set(scanner_wells.keys()) - {pos for pos, _ in layout})
     if extra_positions:
+        extra_positions.sort()
         print(
             "Warning: scanner reported positions not present in the CSV layout: "
             + ", ".join(extra_positions),